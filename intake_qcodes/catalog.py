@@ -1,12 +1,14 @@
 import json
 from pathlib import Path
+import pandas as pd
 from intake.catalog import Catalog
 from intake.catalog.local import LocalCatalogEntry
 from qcodes.dataset.sqlite.database import connect
 from qcodes.dataset.sqlite.connection import ConnectionPlus
 from qcodes.dataset.guids import validate_guid_format
-from intake_qcodes.datasets import get_runs, get_names_from_experiment_id, parameters_from_description
+from intake_qcodes.datasets import get_runs, get_names_from_experiment_id, parameters_from_description, get_cached_snapshot_values
 from intake_qcodes.plots import make_default_plots
+from intake_qcodes.executor import run_blocking, get_connection
 
 
 known_types = {
@@ -15,13 +17,36 @@ known_types = {
 }
 
 
+class QCodesCatalogEntry(LocalCatalogEntry):
+    """ LocalCatalogEntry that does not drag the whole catalog along when pickled """
+
+    def __getstate__(self):
+        kwargs = {key: val for key, val in self._captured_init_kwargs.items() if key != 'catalog'}
+        kwargs['metadata'] = {key: val for key, val in kwargs['metadata'].items() if key != 'plots'}
+        return {
+            'cls': self.classname,
+            'args': (),
+            'kwargs': kwargs,
+        }
+
+    def __setstate__(self, state):
+        # plots are left out of the pickle, rebuild them like the sources do
+        kwargs = state['kwargs']
+        run_description = kwargs['args'].get('run_description')
+        if run_description and 'plots' not in kwargs['metadata']:
+            kwargs['metadata']['plots'] = make_default_plots(run_description)
+        super().__setstate__(state)
+
+
 class QCodesCatalog(Catalog):
 
     name = "qcodes_catalog"
     version = '0.0.1'
 
-    def __init__(self, path, dtype='dataframe', **kwargs):
+    def __init__(self, path, dtype='dataframe', entries_path=None, **kwargs):
         """
+        entries_path: JSON Lines file written by to_jsonl. If given, entries are
+            read from there instead of the database.
         kwargs go to Catalog.__init__
         """
 
@@ -33,7 +58,7 @@ class QCodesCatalog(Catalog):
 
         self._db_path = Path(path).absolute()
         self._db_path = Path(self._db_path.resolve())
-        self._connection = None # database connection
+        self._entries_path = entries_path
         self._guid_lookup = {} # {run_id: guid} pairs
         self._run_id_lookup = {} # {guid: run_id} pairs
         self._experiments = []
@@ -43,61 +68,162 @@ class QCodesCatalog(Catalog):
 
     @property
     def conn(self):
-        if not self._connection:
-            self._connection = connect(self._db_path)
-        return self._connection
+        return get_connection(self._db_path)
+
+    async def load_async(self):
+        """ awaitable version of force_reload """
+        return await run_blocking(self.force_reload)
+
+    async def get_async(self, identifier):
+        """ open the source for a guid (str) or run_id (int) without blocking """
+        return await run_blocking(self[identifier])
+
+    async def read_async(self, identifier, **kwargs):
+        """ awaitable version of self[identifier].read(), kwargs go to read """
+        source = await self.get_async(identifier)
+        return await source.read_async(**kwargs)
+
+    async def read_partition_async(self, identifier, idx):
+        """ awaitable version of self[identifier].read_partition(idx) """
+        source = await self.get_async(identifier)
+        return await source.read_partition_async(idx)
+
+    async def discover_async(self, identifier):
+        """ awaitable version of self[identifier].discover() """
+        source = await self.get_async(identifier)
+        return await source.discover_async()
+
+    async def len_async(self, identifier):
+        """ awaitable version of len(self[identifier]) """
+        source = await self.get_async(identifier)
+        return await source.len_async()
+
+    async def describe_async(self, identifier):
+        """ awaitable version of self[identifier].describe() """
+        source = await self.get_async(identifier)
+        return await source.describe_async()
 
     def _load(self):
         """ load entries into catalog """
 
         self._entries = {}
 
+        if self._entries_path:
+            runs = self._runs_from_jsonl()
+        else:
+            runs = self._runs_from_db()
+
         exps = set()
         samples = set()
-        for row in get_runs(self.conn):
+        for guid, run_id, run_description, metadata in runs:
 
-            run_description = json.loads(row['run_description'])
-
-            # move these functions so they can be loaded elsewhere
-            exp_name, sample_name = get_names_from_experiment_id(self.conn, row['exp_id'])
-            dependent_parameters, independent_parameters = parameters_from_description(run_description)
-
-            self._entries[row['guid']] = LocalCatalogEntry(
-                name='run {}'.format(row['run_id']),
-                description='run {} at {} with guid {}'.format(row['run_id'], str(self._db_path), row['guid']),
+            self._entries[guid] = QCodesCatalogEntry(
+                name='run {}'.format(run_id),
+                description='run {} at {} with guid {}'.format(run_id, str(self._db_path), guid),
                 driver=self._source_driver,
                 direct_access='forbid',
                 args={
                     'db_path': str(self._db_path),
-                    'guid': row['guid'],
-                    'run_id': row['run_id']
+                    'guid': guid,
+                    'run_id': run_id,
+                    'run_description': run_description,
                 },
                 cache=None,
                 parameters=[],
-                metadata={
-                    "start_time": row['run_timestamp'],
-                    "stop_time": row['completed_timestamp'],
-                    "dependent_parameters": dependent_parameters,
-                    "independent_parameters": independent_parameters,
-                    "experiment_name": exp_name,
-                    "sample_name": sample_name,
-                    "table_name": row['result_table_name'],
-                    'plots': make_default_plots(run_description),
-                },
+                metadata=metadata,
                 catalog_dir=str(self._db_path),
                 getenv=False,
                 getshell=False,
                 catalog=self,
             )
 
-            self._guid_lookup[row['run_id']] = row['guid']
-            exps.add(exp_name)
-            samples.add(sample_name)
+            self._guid_lookup[run_id] = guid
+            exps.add(metadata['experiment_name'])
+            samples.add(metadata['sample_name'])
 
         self._experiments = list(exps)
         self._samples = list(samples)
         self._run_id_lookup = {val: key for key, val in self._guid_lookup.items()}
 
+    def _runs_from_db(self):
+        """ yield (guid, run_id, run_description, metadata) for each run in the database """
+
+        for row in get_runs(self.conn):
+
+            run_description = json.loads(row['run_description'])
+
+            # move these functions so they can be loaded elsewhere
+            exp_name, sample_name = get_names_from_experiment_id(self.conn, row['exp_id'])
+            dependent_parameters, independent_parameters = parameters_from_description(run_description)
+
+            metadata = {
+                "start_time": row['run_timestamp'],
+                "stop_time": row['completed_timestamp'],
+                "dependent_parameters": dependent_parameters,
+                "independent_parameters": independent_parameters,
+                "experiment_name": exp_name,
+                "sample_name": sample_name,
+                "table_name": row['result_table_name'],
+                'plots': make_default_plots(run_description),
+            }
+
+            yield row['guid'], row['run_id'], run_description, metadata
+
+    def _runs_from_jsonl(self):
+        """ yield (guid, run_id, run_description, metadata) for each line written by to_jsonl """
+
+        with open(self._entries_path) as f:
+            next(f) # header
+            for line in f:
+                run = json.loads(line)
+                # same metadata as entries loaded from the database
+                run['metadata']['plots'] = make_default_plots(run['run_description'])
+                yield run['guid'], run['run_id'], run['run_description'], run['metadata']
+
+    def to_jsonl(self, fname):
+        """
+        Write the catalog to a JSON Lines file, one run per line.
+
+        Entries are written one at a time, so memory use does not grow with the
+        size of the catalog. Plots are left out, from_jsonl rebuilds them from the
+        run description.
+        """
+
+        header = {
+            'name': self.name,
+            'metadata': self.metadata,
+            'db_path': str(self._db_path),
+            'dtype': self._dtype,
+        }
+
+        with open(fname, 'w') as f:
+            f.write(json.dumps(header) + '\n')
+            for guid, entry in self._entries.items():
+                kw = entry._captured_init_kwargs
+                run = {
+                    'guid': guid,
+                    'run_id': kw['args']['run_id'],
+                    'run_description': kw['args']['run_description'],
+                    'metadata': {key: val for key, val in kw['metadata'].items() if key != 'plots'},
+                }
+                f.write(json.dumps(run) + '\n')
+
+    @classmethod
+    def from_jsonl(cls, fname, path=None, **kwargs):
+        """
+        Load a catalog written by to_jsonl without scanning the database.
+        path: where the database is on this machine. defaults to the path
+            it was exported from
+        kwargs go to QCodesCatalog.__init__
+        """
+
+        with open(fname) as f:
+            header = json.loads(next(f))
+
+        kwargs.setdefault('dtype', header['dtype'])
+        kwargs.setdefault('metadata', header['metadata'])
+        return cls(path or header['db_path'], entries_path=fname, **kwargs)
+
     def search(self, query: dict):
         ## TODO: add some functionality to select only some subset of the datasets
         query_keys = [
@@ -161,10 +287,12 @@ class QCodesCatalog(Catalog):
         import yaml
         output = {"metadata": self.metadata, "sources": {},
                   "name": self.name}
-        for key, entry in self.items():
+        for key, entry in self._entries.items():
             # hack to fix serializing the name of the custom catalog
             kw = entry._captured_init_kwargs.copy()
             kw.pop('catalog')
+            # sources fetch it from the database again, keeps the yaml small
+            kw['args'] = {key: val for key, val in kw['args'].items() if key != 'run_description'}
 
             if isinstance(kw['parameters'], list):
                 if not kw['parameters']:
@@ -178,6 +306,19 @@ class QCodesCatalog(Catalog):
 
         return yaml.dump(output)
 
+    def snapshot_values(self, path):
+        """ Get one value out of the station snapshot of every run in the catalog.
+        path: 'station.instruments.fridge.parameters.T.value' or a tuple of keys
+
+        Returns a pandas.Series indexed by guid
+        """
+        guids = self.guids
+        values = get_cached_snapshot_values(self.conn, path, guids)
+
+        name = path if isinstance(path, str) else '.'.join(map(str, path))
+        return pd.Series([values.get(guid) for guid in guids],
+                         index=pd.Index(guids, name='guid'), name=name)
+
     def guid_from_run_id(self, run_id):
         return self._guid_lookup[run_id]
 
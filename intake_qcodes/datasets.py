@@ -1,5 +1,16 @@
-from typing import Optional, List, Union, Sequence
+from typing import Optional, List, Union, Sequence, Tuple
 from warnings import warn
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
 import numpy as np
 import pandas as pd
 from pandas import DataFrame
@@ -7,10 +18,15 @@ import xarray as xr
 from xarray import DataArray, Dataset
 from qcodes.dataset.data_set import DataSet
 from qcodes.dataset.sqlite.connection import ConnectionPlus, transaction, atomic
+from qcodes.dataset.sqlite.database import (
+    _adapt_array, _convert_array, _convert_numeric, _adapt_complex, _convert_complex,
+)
 from qcodes.dataset.sqlite.query_helpers import select_many_where
 from qcodes.dataset.sqlite.queries import get_parameter_tree_values
 from qcodes.dataset.descriptions.versioning.serialization import from_dict_to_current
 
+logger = logging.getLogger(__name__)
+
 
 def get_runs(conn):
     """ Get a list of runs.
@@ -48,6 +64,209 @@ def get_names_from_experiment_id(conn, exp_id):
                                 "exp_id", "run_id", self.run_id)
 
 
+def connect_read_only(db_path):
+    """ Open a read-only connection to a qcodes database.
+
+    qcodes.connect runs init_db on every connection, which needs write access.
+    Here only the adapters/converters are registered so that array, numeric
+    and complex columns come back as they would through qcodes.
+    """
+
+    sqlite3.register_adapter(np.ndarray, _adapt_array)
+    sqlite3.register_converter("array", _convert_array)
+    sqlite3.register_converter("numeric", _convert_numeric)
+    sqlite3.register_adapter(complex, _adapt_complex)
+    sqlite3.register_converter("complex", _convert_complex)
+
+    uri = f"{Path(db_path).absolute().as_uri()}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, detect_types=sqlite3.PARSE_DECLTYPES)
+    conn = ConnectionPlus(conn)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def get_rowid_ranges(conn, run_table_name, nranges):
+    """ Split the rows of a results table into (at most) nranges contiguous
+    rowid ranges. Ranges are inclusive on both ends. """
+
+    sql = f'SELECT MIN(id), MAX(id) FROM "{run_table_name}"'
+    first, last = transaction(conn, sql).fetchone()
+    if first is None:
+        return []
+
+    step = -(-(last - first + 1) // nranges) # ceiling division
+    return [(start, min(start + step - 1, last))
+            for start in range(first, last + 1, step)]
+
+
+def get_parameter_tree_values_by_rowid(
+    conn: ConnectionPlus,
+    run_table_name: str,
+    toplevel_param_name: str,
+    *other_param_names,
+    rowid_range: Tuple[int, int],
+):
+    """
+    Same as qcodes.dataset.sqlite.queries.get_parameter_tree_values, but
+    restricted to rows with rowid_range[0] <= id <= rowid_range[1].
+    """
+
+    columns = ', '.join(f'"{name}"' for name in (toplevel_param_name,) + other_param_names)
+    sql = f"""
+          SELECT {columns} FROM "{run_table_name}"
+          WHERE "{toplevel_param_name}" IS NOT NULL
+          AND id BETWEEN ? AND ?
+          """
+    c = transaction(conn, sql, *rowid_range)
+    return [list(row) for row in c.fetchall()]
+
+
+# extracted snapshot values {(guid, keys): value}, least recently used first
+# guids are unique across databases, so this can be shared by all sources
+_snapshot_cache = OrderedDict()
+_snapshot_cache_size = 100_000
+# sources run on a shared thread pool (see executor.py)
+_snapshot_cache_lock = threading.Lock()
+_missing = object()
+# guids per IN (...) query, below the sqlite limit on host parameters
+_snapshot_guids_per_query = 500
+
+# whether sqlite was built with the JSON1 extension, checked on first use
+_has_json1 = None
+
+
+def _snapshot_keys(path):
+    """ 'station.instruments.fridge' -> ('station', 'instruments', 'fridge')
+    use a tuple/list if a key contains a '.', integers index into lists """
+    if isinstance(path, str):
+        return tuple(path.split('.'))
+    return tuple(path)
+
+
+def _snapshot_json_path(keys):
+    """ ('station', 'instruments', 0) -> '$."station"."instruments"[0]' """
+    json_path = '$'
+    for key in keys:
+        if isinstance(key, int):
+            json_path += f'[{key}]'
+        else:
+            key = str(key).replace('"', '\\"')
+            json_path += f'."{key}"'
+    return json_path
+
+
+def _walk_snapshot(snapshot, keys):
+    value = snapshot
+    for key in keys:
+        try:
+            value = value[key]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return value
+
+
+def _json1_available(conn):
+    global _has_json1
+    if _has_json1 is None:
+        try:
+            transaction(conn, "SELECT json('{}')").fetchone()
+            _has_json1 = True
+        except sqlite3.OperationalError:
+            _has_json1 = False
+    return _has_json1
+
+
+def get_snapshot_values(conn, path, guids=None):
+    """ Get a single value out of the station snapshot of many runs
+    without loading the whole snapshot into python.
+
+    Args:
+        conn:   database connection
+        path:   'station.instruments.fridge.parameters.T.value' or
+                a tuple of keys
+        guids:  runs to look at. if None all runs are included
+    Returns:
+        {guid: value} where value is None if the path does not exist
+    """
+
+    keys = _snapshot_keys(path)
+    json_path = _snapshot_json_path(keys)
+    json1 = _json1_available(conn)
+
+    if guids is None:
+        where, chunks = '', [()]
+    else:
+        guids = list(guids)
+        n = _snapshot_guids_per_query
+        where = 'WHERE guid IN ({})'
+        chunks = [guids[i:i+n] for i in range(0, len(guids), n)]
+
+    values = {}
+    for chunk in chunks:
+        chunk_where = where.format(', '.join('?'*len(chunk)))
+        if json1:
+            sql = f"""
+                  SELECT guid, json_type(snapshot, ?), json_extract(snapshot, ?)
+                  FROM runs {chunk_where}
+                  """
+            c = transaction(conn, sql, json_path, json_path, *chunk)
+            for guid, json_type, value in c.fetchall():
+                if json_type in ('object', 'array'):
+                    value = json.loads(value)
+                elif json_type in ('true', 'false'):
+                    value = bool(value)
+                values[guid] = value
+        else:
+            sql = f"SELECT guid, snapshot FROM runs {chunk_where}"
+            c = transaction(conn, sql, *chunk)
+            for guid, snapshot in c.fetchall():
+                snapshot = json.loads(snapshot) if snapshot else {}
+                values[guid] = _walk_snapshot(snapshot, keys)
+
+    return values
+
+
+def get_cached_snapshot_values(conn, path, guids):
+    """ Same as get_snapshot_values, but values already extracted for a guid
+    are served from a cache and only the missing guids are queried.
+    The cache keeps the _snapshot_cache_size most recently used values. """
+
+    keys = _snapshot_keys(path)
+
+    values = {}
+    missing = []
+    with _snapshot_cache_lock:
+        for guid in guids:
+            value = _snapshot_cache.get((guid, keys), _missing)
+            if value is _missing:
+                missing.append(guid)
+            else:
+                _snapshot_cache.move_to_end((guid, keys))
+                values[guid] = value
+
+    if missing:
+        if len(missing) > _snapshot_guids_per_query:
+            # one pass over the runs table beats many IN (...) queries
+            found = get_snapshot_values(conn, keys)
+        else:
+            found = get_snapshot_values(conn, keys, guids=missing)
+
+        with _snapshot_cache_lock:
+            for guid in missing:
+                values[guid] = found.get(guid)
+                _snapshot_cache[(guid, keys)] = values[guid]
+            while len(_snapshot_cache) > _snapshot_cache_size:
+                _snapshot_cache.popitem(last=False)
+
+    return values
+
+
+def get_snapshot_value(conn, guid, path):
+    """ Get a single value out of the station snapshot of one run, cached by guid. """
+
+    return get_cached_snapshot_values(conn, path, [guid])[guid]
+
+
 def parameters_from_description(desc):
 
     dependent_parameters = []
@@ -60,11 +279,66 @@ def parameters_from_description(desc):
     return dependent_parameters, independent_parameters
 
 
+def _parameter_trees(interdeps, columns):
+    """ (param, [param, *dependencies], [types]) for each requested parameter """
+
+    trees = []
+    for param in columns:
+        param_spec = interdeps._id_to_paramspec[param]
+        # find all the dependencies of this param
+        paramspecs = [param_spec] \
+                   + list(interdeps.dependencies.get(param_spec, ()))
+        param_names = [param.name for param in paramspecs]
+        types = [param.type for param in paramspecs]
+        trees.append((param, param_names, types))
+    return trees
+
+
+def _tree_to_dict(results, param_names, types):
+    """ rows of (param, *dependencies) values -> {name: np.array} """
+
+    # if we have array type parameters expand all other parameters
+    # to arrays
+    if 'array' in types and ('numeric' in types or 'text' in types
+                             or 'complex' in types):
+        first_array_element = types.index('array')
+        numeric_elms = [i for i, x in enumerate(types)
+                        if x == "numeric"]
+        complex_elms = [i for i, x in enumerate(types)
+                        if x == 'complex']
+        text_elms = [i for i, x in enumerate(types)
+                     if x == "text"]
+        for row in results:
+            for element in numeric_elms:
+                row[element] = np.full_like(row[first_array_element],
+                                            row[element],
+                                            dtype=np.float)
+
+            for element in complex_elms:
+                row[element] = np.full_like(row[first_array_element],
+                                            row[element],
+                                            dtype=np.complex)
+            for element in text_elms:
+                strlen = len(row[element])
+                row[element] = np.full_like(row[first_array_element],
+                                            row[element],
+                                            dtype=f'U{strlen}')
+
+    results_t = map(list, zip(*results))
+
+    return {
+        name: np.array(column_data)
+        for name, column_data
+        in zip(param_names, results_t)
+    }
+
+
 def get_parameter_data(
     conn: ConnectionPlus,
     run_table_name: str,
     run_description: dict,
-    columns: Sequence[str] = ()
+    columns: Sequence[str] = (),
+    rowid_range: Optional[Tuple[int, int]] = None,
 ):
     """
     Get data for one or more parameters and its dependencies. The data
@@ -89,6 +363,8 @@ def get_parameter_data(
         table_name: name of the table
         columns: list of columns. If no columns are provided, all parameters
             are returned.
+        rowid_range: (first, last) rowids of the results table to read,
+            both ends included. If None, the whole table is read.
     """
 
 
@@ -100,53 +376,354 @@ def get_parameter_data(
         columns = [ps.name for ps in interdeps.non_dependencies]
 
     # loop over all the requested parameters
-    for param in columns:
-        param_spec = interdeps._id_to_paramspec[param]
-        # find all the dependencies of this param
-        paramspecs = [param_spec] \
-                   + list(interdeps.dependencies.get(param_spec, ()))
-        param_names = [param.name for param in paramspecs]
-        types = [param.type for param in paramspecs]
+    for param, param_names, types in _parameter_trees(interdeps, columns):
+
+        if rowid_range is None:
+            results = get_parameter_tree_values(conn,
+                                            run_table_name,
+                                            param,
+                                            *param_names[1:])
+        else:
+            results = get_parameter_tree_values_by_rowid(conn,
+                                                     run_table_name,
+                                                     param,
+                                                     *param_names[1:],
+                                                     rowid_range=rowid_range)
+
+        datadict[param] = _tree_to_dict(results, param_names, types)
+
+    return datadict
+
+
+def _setpoint_key(row, indices):
+    """ hashable, comparable setpoint values of a row """
+    return tuple(row[i].tobytes() if isinstance(row[i], np.ndarray) else row[i]
+                 for i in indices)
+
+
+def iter_parameter_data(
+    conn: ConnectionPlus,
+    run_table_name: str,
+    run_description: dict,
+    columns: Sequence[str] = (),
+    chunksize: int = 100_000,
+):
+    """
+    Generator version of get_parameter_data that walks the results table
+    once, in blocks of about chunksize rows, and yields a datadict with all
+    the requested parameters for each block. Setpoints shared by several
+    parameters are only read once and memory use does not grow with the
+    size of the run. The read rate (rows/s) is logged when done.
+
+    qcodes may store the parameters measured at one setpoint in separate,
+    adjacent rows. Blocks are therefore cut after the last change of setpoint
+    values and the rows of that last setpoint are carried over to the next
+    block, which can make it longer than chunksize by that many rows. Runs
+    without setpoints, and blocks that hold a single setpoint, are cut at
+    chunksize. As long as chunksize is at least the number of rows stored for
+    one setpoint, the blocks concatenate to the same data as
+    get_parameter_data.
+
+    Args:
+        conn: database connection
+        run_table_name: name of the results table
+        run_description: run description as a dict
+        columns: list of columns. If no columns are provided, all parameters
+            are returned.
+        chunksize: number of rows of the results table per block
+    """
+
+    rd = from_dict_to_current(run_description)
+    interdeps = rd.interdeps
 
-        results = get_parameter_tree_values(conn,
-                                        run_table_name,
-                                        param,
-                                        *param_names[1:])
-
-        # if we have array type parameters expand all other parameters
-        # to arrays
-        if 'array' in types and ('numeric' in types or 'text' in types
-                                 or 'complex' in types):
-            first_array_element = types.index('array')
-            numeric_elms = [i for i, x in enumerate(types)
-                            if x == "numeric"]
-            complex_elms = [i for i, x in enumerate(types)
-                            if x == 'complex']
-            text_elms = [i for i, x in enumerate(types)
-                         if x == "text"]
-            for row in results:
-                for element in numeric_elms:
-                    row[element] = np.full_like(row[first_array_element],
-                                                row[element],
-                                                dtype=np.float)
-
-                for element in complex_elms:
-                    row[element] = np.full_like(row[first_array_element],
-                                                row[element],
-                                                dtype=np.complex)
-                for element in text_elms:
-                    strlen = len(row[element])
-                    row[element] = np.full_like(row[first_array_element],
-                                                row[element],
-                                                dtype=f'U{strlen}')
-
-        results_t = map(list, zip(*results))
-
-        datadict[param] = {
-            name: np.array(column_data)
-            for name, column_data
-            in zip(param_names, results_t)
-        }
+    if len(columns) == 0:
+        columns = [ps.name for ps in interdeps.non_dependencies]
+    trees = _parameter_trees(interdeps, columns)
+
+    # every column needed by any of the requested parameters, each read once
+    names = list(dict.fromkeys(name for _, param_names, _ in trees for name in param_names))
+    index = {name: i for i, name in enumerate(names)}
+    setpoints = [index[name] for name in names if name not in columns]
+    sql = f"""
+          SELECT {', '.join(f'"{name}"' for name in names)} FROM "{run_table_name}"
+          WHERE id BETWEEN ? AND ?
+          """
+
+    def _to_datadict(rows):
+        datadict = {}
+        for param, param_names, types in trees:
+            i_param = index[param]
+            i_cols = [index[name] for name in param_names]
+            results = [[row[i] for i in i_cols]
+                       for row in rows if row[i_param] is not None]
+            datadict[param] = _tree_to_dict(results, param_names, types)
+        return datadict
+
+    first, last = transaction(conn, f'SELECT MIN(id), MAX(id) FROM "{run_table_name}"').fetchone()
+    if first is None:
+        return
+
+    nrows = 0
+    elapsed = 0.0
+    pending = [] # rows of the last setpoint of the previous block
+    try:
+        for start in range(first, last + 1, chunksize):
+            t0 = time.perf_counter()
+            rows = pending + transaction(conn, sql, start, start + chunksize - 1).fetchall()
+
+            # cut after the last change of setpoint values, if there is one
+            cut = len(rows)
+            if setpoints and start + chunksize <= last:
+                for i in range(len(rows) - 1, 0, -1):
+                    if _setpoint_key(rows[i], setpoints) != _setpoint_key(rows[i-1], setpoints):
+                        cut = i
+                        break
+            rows, pending = rows[:cut], rows[cut:]
+            if not rows:
+                elapsed += time.perf_counter() - t0
+                continue
+
+            datadict = _to_datadict(rows)
+            nrows += len(rows)
+            elapsed += time.perf_counter() - t0
+            yield datadict
+    finally:
+        if elapsed:
+            logger.info(f'read {nrows} rows of {run_table_name} in {elapsed:.2f} s '
+                        f'({nrows/elapsed:.0f} rows/s)')
+
+
+def _attach_shared_memory(name):
+    """ open an existing shared memory block without handing it to the
+    resource tracker, the process that created it is in charge of unlinking """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # python < 3.13
+        return shared_memory.SharedMemory(name=name)
+
+
+def _concatenate_blocks(blocks):
+    try:
+        return np.concatenate(blocks)
+    except ValueError:
+        # a mix of regular (2d) and ragged (object) array rows
+        rows = [row for block in blocks for row in block]
+        out = np.empty(len(rows), dtype=object)
+        out[:] = rows
+        return out
+
+
+def _probe_parameter_tree(conn, run_table_name, param_names, types):
+    """ decode the first row of a parameter tree
+    returns {name: (dtype, shape of one row)} """
+
+    columns = ', '.join(f'"{name}"' for name in param_names)
+    sql = f"""
+          SELECT {columns} FROM "{run_table_name}"
+          WHERE "{param_names[0]}" IS NOT NULL
+          LIMIT 1
+          """
+    results = [list(row) for row in transaction(conn, sql).fetchall()]
+    return {name: (arr.dtype, arr.shape[1:])
+            for name, arr in _tree_to_dict(results, param_names, types).items()}
+
+
+def _count_rowid_range(db_path, run_table_name, columns, rowid_range):
+    """ worker for get_parameter_data_parallel
+    number of non-NULL rows of each parameter in the range """
+
+    conn = connect_read_only(db_path)
+    try:
+        counts = ', '.join(f'COUNT("{param}")' for param in columns)
+        sql = f'SELECT {counts} FROM "{run_table_name}" WHERE id BETWEEN ? AND ?'
+        return list(transaction(conn, sql, *rowid_range).fetchone())
+    finally:
+        conn.close()
+
+
+def _read_rowid_range(db_path, run_table_name, run_description, columns,
+                      rowid_range, buffers, offsets):
+    """
+    worker for get_parameter_data_parallel
+
+    Decodes the range and writes each array straight into its slice of the
+    shared memory buffers {param: {name: (shm_name, shape, dtype)}}, starting
+    at offsets[param]. Arrays that don't fit a buffer (ragged arrays, text,
+    a dtype the buffer can't hold without loss) are returned as
+    {param: {name: array}}.
+    """
+
+    conn = connect_read_only(db_path)
+    try:
+        datadict = get_parameter_data(
+            conn, run_table_name, run_description,
+            columns=columns, rowid_range=rowid_range,
+        )
+    finally:
+        conn.close()
+
+    leftovers = {}
+    for param, subdict in datadict.items():
+        for name, arr in subdict.items():
+            block = buffers.get(param, {}).get(name)
+            if block is not None:
+                shm_name, shape, dtype = block
+                dtype = np.dtype(dtype)
+                if (arr.shape[1:] == tuple(shape[1:])
+                        and np.can_cast(arr.dtype, dtype, 'safe')):
+                    shm = _attach_shared_memory(shm_name)
+                    try:
+                        out = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+                        out[offsets[param]:offsets[param] + len(arr)] = arr
+                        del out
+                    finally:
+                        shm.close()
+                    continue
+            leftovers.setdefault(param, {})[name] = arr
+
+    return leftovers
+
+
+def get_parameter_data_parallel(
+    db_path,
+    run_table_name: str,
+    run_description: dict,
+    columns: Sequence[str] = (),
+    nworkers: Optional[int] = None,
+):
+    """
+    Parallel version of get_parameter_data for large runs.
+
+    The results table is split into nworkers rowid ranges. Worker processes,
+    each with its own read-only connection, first count the rows of every
+    parameter in their range. The final arrays are then allocated once in
+    shared memory and every worker decodes its range and writes it in place.
+    Arrays that can't live in a fixed buffer (ragged arrays, text) are sent
+    back and concatenated instead. Buffers take the dtype of the first row of
+    each parameter; a range that needs a wider one (a float in a column that
+    started with integers) is also sent back, so the concatenation promotes
+    the result the same way get_parameter_data does. The returned datadict is
+    the same as the one from get_parameter_data, dtypes included.
+
+    Workers are started with 'spawn', so scripts calling this need the usual
+    `if __name__ == '__main__':` guard.
+
+    Args:
+        db_path: path to the database
+        run_table_name: name of the results table
+        run_description: run description as a dict
+        columns: list of columns. If no columns are provided, all parameters
+            are returned.
+        nworkers: number of processes. Defaults to os.cpu_count().
+    """
+
+    nworkers = nworkers or os.cpu_count() or 1
+
+    interdeps = from_dict_to_current(run_description).interdeps
+    if len(columns) == 0:
+        columns = [ps.name for ps in interdeps.non_dependencies]
+    columns = list(columns)
+    trees = _parameter_trees(interdeps, columns)
+
+    conn = connect_read_only(db_path)
+    try:
+        ranges = get_rowid_ranges(conn, run_table_name, nworkers)
+        if len(ranges) < 2:
+            return get_parameter_data(conn, run_table_name, run_description, columns=columns)
+        probes = {param: _probe_parameter_tree(conn, run_table_name, param_names, types)
+                  for param, param_names, types in trees}
+    finally:
+        conn.close()
+
+    segments = [] # every shared memory block created here, unlinked no matter what
+    # spawn, not fork: this may run from a thread (see QCodesBase.read_async)
+    pool = ProcessPoolExecutor(max_workers=len(ranges),
+                               mp_context=multiprocessing.get_context('spawn'))
+    try:
+        with pool:
+            counts = [
+                f.result() for f in
+                [pool.submit(_count_rowid_range, str(db_path), run_table_name, columns, r)
+                 for r in ranges]
+            ]
+
+            # counts[i][j] rows of columns[j] in ranges[i]
+            offsets = [{} for _ in ranges]
+            totals = {}
+            for j, param in enumerate(columns):
+                total = 0
+                for i in range(len(ranges)):
+                    offsets[i][param] = total
+                    total += counts[i][j]
+                totals[param] = total
+
+            buffers = {}
+            for param, _, _ in trees:
+                buffers[param] = {}
+                for name, (dtype, row_shape) in probes[param].items():
+                    if dtype.kind not in 'biufc':
+                        continue
+                    shape = (totals[param],) + row_shape
+                    nbytes = int(np.prod(shape)) * dtype.itemsize
+                    if nbytes == 0:
+                        continue
+                    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+                    segments.append(shm)
+                    buffers[param][name] = (shm.name, shape, dtype.str)
+
+            futures = [
+                pool.submit(_read_rowid_range, str(db_path), run_table_name,
+                            run_description, columns, rowid_range,
+                            buffers, offsets[i])
+                for i, rowid_range in enumerate(ranges)
+            ]
+            try:
+                leftovers = [f.result() for f in futures]
+            except BaseException:
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+
+        datadict = {}
+        shm_by_name = {shm.name: shm for shm in segments}
+        for param, param_names, _ in trees:
+            datadict[param] = {}
+            if totals[param] == 0:
+                continue
+            for name in param_names:
+                if name in buffers[param]:
+                    shm_name, shape, dtype = buffers[param][name]
+                    full = np.ndarray(shape, dtype=np.dtype(dtype),
+                                      buffer=shm_by_name[shm_name].buf)
+                else:
+                    full = None
+
+                if not any(name in part.get(param, {}) for part in leftovers):
+                    datadict[param][name] = full.copy()
+                    del full
+                    continue
+
+                pieces = []
+                for i, part in enumerate(leftovers):
+                    n = counts[i][columns.index(param)]
+                    if n == 0:
+                        continue
+                    if name in part.get(param, {}):
+                        pieces.append(part[param][name])
+                    else:
+                        start = offsets[i][param]
+                        pieces.append(full[start:start + n].copy())
+                datadict[param][name] = _concatenate_blocks(pieces)
+                del pieces, full
+    finally:
+        for shm in segments:
+            shm.unlink()
+            try:
+                shm.close()
+            except BufferError:
+                # a view is still alive while an exception is on its way out,
+                # the mapping goes away with it
+                pass
 
     return datadict
 
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from qcodes.dataset.sqlite.database import connect
+
+# shared by every source and catalog, so the number of threads working on
+# the database at once stays bounded no matter how many requests come in
+_executor = None
+_max_workers = 4
+
+# sqlite connections can't be used from another thread, so each thread keeps
+# one connection per database, shared by all sources and catalogs. they go
+# away with the thread, so there are at most (#threads x #databases) of them
+_local = threading.local()
+
+
+def _thread_connections():
+    """ {db_path: connection} of the calling thread """
+    if not hasattr(_local, 'connections'):
+        _local.connections = {}
+    return _local.connections
+
+
+def get_connection(db_path):
+    """ qcodes connection to db_path for the calling thread """
+    connections = _thread_connections()
+    key = str(Path(db_path).absolute())
+    if key not in connections:
+        connections[key] = connect(key)
+    return connections[key]
+
+
+def get_executor():
+    """ the ThreadPoolExecutor used by the *_async methods """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=_max_workers,
+                                       thread_name_prefix='intake_qcodes')
+    return _executor
+
+
+def set_max_workers(max_workers):
+    """ change the number of threads used by the *_async methods
+    work already submitted finishes on the old executor, whose threads
+    then exit and take their connections with them """
+    global _executor, _max_workers
+    _max_workers = max_workers
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+async def run_blocking(func, *args):
+    """
+    Run func(*args) in the shared executor without blocking the event loop.
+
+    If the awaiting task is cancelled while func is still running, the
+    queries on the worker thread's connections (see get_connection) are
+    interrupted instead of being left to run to completion. Work func hands
+    to other processes (read(nworkers=...)) is not stopped.
+    """
+
+    loop = asyncio.get_running_loop()
+    job = {'connections': None, 'done': False}
+    # held while checking/interrupting, so the worker thread can't finish
+    # this job and start another one on the same connection in between
+    lock = threading.Lock()
+
+    def _target():
+        job['connections'] = _thread_connections()
+        try:
+            return func(*args)
+        finally:
+            with lock:
+                job['done'] = True
+
+    try:
+        return await loop.run_in_executor(get_executor(), _target)
+    except asyncio.CancelledError:
+        with lock:
+            # the thread runs one job at a time, so its connections are ours
+            if job['connections'] and not job['done']:
+                for conn in job['connections'].values():
+                    conn.interrupt()
+        raise
@@ -1,13 +1,15 @@
 from pathlib import Path
 import json
+import threading
 from intake.source.base import DataSource, Schema
 from qcodes.dataset.sqlite.database import connect
 from qcodes.dataset.data_set import DataSet
 from qcodes.dataset.sqlite.queries import get_runid_from_guid, get_guid_from_run_id, get_run_description
 from qcodes.dataset.sqlite.query_helpers import select_one_where
 from qcodes.dataset.descriptions.versioning.serialization import to_dict_for_storage
-from intake_qcodes.datasets import get_parameter_data, datadict_to_dataframe, parameters_from_description, datadict_to_xarray
+from intake_qcodes.datasets import get_parameter_data, get_parameter_data_parallel, datadict_to_dataframe, parameters_from_description, datadict_to_xarray, get_snapshot_value, iter_parameter_data
 from intake_qcodes.plots import make_default_plots
+from intake_qcodes.executor import run_blocking, get_connection
 
 class QCodesBase(DataSource):
     # add sample name and experiment name properties
@@ -15,7 +17,7 @@ class QCodesBase(DataSource):
     version = '0.0.1'
     partition_access = True
 
-    def __init__(self, db_path, guid=None, run_id=None, metadata=None):
+    def __init__(self, db_path, guid=None, run_id=None, run_description=None, metadata=None):
 
         self._db_path = Path(db_path).absolute()
         self._guid = guid
@@ -23,10 +25,9 @@ class QCodesBase(DataSource):
         self._experiment_id = None
         self._sample = ''
         self._experiment = ''
-        self._connection = None
-        self._qcodes_dataset = None
+        self._local = threading.local() # qcodes.DataSet per thread, it holds that thread's connection
         self._datadict = {}
-        self._run_description = {}
+        self._run_description = run_description or {}
         self._table_name = ''
         self._length = None
         self._snapshot = {}
@@ -36,7 +37,11 @@ class QCodesBase(DataSource):
         if 'plots' not in self.metadata:
             self.metadata['plots'] = make_default_plots(self.run_description)
 
-    def _read_data(self, columns=()):
+    def _read_data(self, columns=(), nworkers=None):
+        """
+        nworkers: if given, split the results table into rowid ranges and
+            decode them in that many processes (see get_parameter_data_parallel)
+        """
 
         if not columns:
             columns, _ = parameters_from_description(self.run_description)
@@ -44,25 +49,50 @@ class QCodesBase(DataSource):
         in_memory = tuple(self._datadict.keys())
         to_read = list(set(columns).difference(in_memory))
 
-        data = get_parameter_data(
-            self._conn,
-            self._run_table_name,
-            self.run_description,
-            columns = to_read,
-        )
+        if not to_read:
+            data = {}
+        elif nworkers:
+            data = get_parameter_data_parallel(
+                self._db_path,
+                self._run_table_name,
+                self.run_description,
+                columns = to_read,
+                nworkers = nworkers,
+            )
+        else:
+            data = get_parameter_data(
+                self._conn,
+                self._run_table_name,
+                self.run_description,
+                columns = to_read,
+            )
 
         for key, val in data.items():
             self._datadict[key] = val
 
         return {col: self._datadict[col] for col in columns}
 
+    def _iter_data(self, columns=(), chunksize=100_000):
+        """ walk the results table once in blocks of chunksize rows
+        nothing is kept in memory between blocks """
+
+        if not columns:
+            columns, _ = parameters_from_description(self.run_description)
+
+        return iter_parameter_data(
+            self._conn,
+            self._run_table_name,
+            self.run_description,
+            columns = columns,
+            chunksize = chunksize,
+        )
+
     def _get_schema(self):
         """
         return instance of Schema
         should take a roughly constant amount of time regardless of contents of dataset
         """
 
-        self._qcodes_dataset = DataSet(run_id=self.run_id, conn=self._conn)
         dep_params, indep_params = parameters_from_description(self.run_description)
 
         return Schema(
@@ -75,22 +105,45 @@ class QCodesBase(DataSource):
             }
         )
 
+    def __getstate__(self):
+        """
+        Only keep what is needed to open the run again. The database connection
+        and qcodes.DataSet are reopened lazily on the other side and the plots
+        are rebuilt from the run description, so pickles sent to dask or
+        multiprocessing workers stay small. intake's DictSerialiseMixin
+        rebuilds the source from this in __setstate__.
+        """
+        metadata = {key: val for key, val in self.metadata.items() if key != 'plots'}
+        return {
+            'cls': self.classname,
+            'args': (),
+            'kwargs': {
+                'db_path': str(self._db_path),
+                'guid': self._guid,
+                'run_id': self._run_id,
+                'run_description': self.run_description,
+                'metadata': metadata,
+            },
+        }
+
+    def _close(self):
+        # connections belong to their thread (see executor.get_connection)
+        self._local = threading.local()
+
     def __len__(self):
         return self._dataset.number_of_results
 
     @property
     def _conn(self):
         """ database connection """
-        if not self._connection:
-            self._connection = connect(self._db_path)
-        return self._connection
+        return get_connection(self._db_path)
 
     @property
     def _dataset(self):
         """ qcodes.DataSet """
-        if not self._qcodes_dataset:
-            self._qcodes_dataset = DataSet(run_id=self.run_id, conn=self._conn)
-        return self._qcodes_dataset
+        if not getattr(self._local, 'dataset', None):
+            self._local.dataset = DataSet(run_id=self.run_id, conn=self._conn)
+        return self._local.dataset
 
     @property
     def _run_table_name(self):
@@ -98,6 +151,28 @@ class QCodesBase(DataSource):
             self._table_name = self._dataset.table_name
         return self._table_name
 
+    async def discover_async(self):
+        """ awaitable version of discover """
+        return await run_blocking(self.discover)
+
+    async def read_async(self, **kwargs):
+        """ awaitable version of read, kwargs go to read
+        cancelling interrupts the database query, but not the worker
+        processes of read(nworkers=...), those run to completion """
+        return await run_blocking(lambda: self.read(**kwargs))
+
+    async def read_partition_async(self, idx):
+        """ awaitable version of read_partition """
+        return await run_blocking(self.read_partition, idx)
+
+    async def len_async(self):
+        """ awaitable version of len(self), the number of results """
+        return await run_blocking(len, self)
+
+    async def describe_async(self):
+        """ awaitable version of describe """
+        return await run_blocking(self.describe)
+
     def canonical(self):
         """ return qcodes.DataSet """
         return self._dataset
@@ -123,6 +198,12 @@ class QCodesBase(DataSource):
             self._snapshot = self._dataset.snapshot
         return self._snapshot
 
+    def snapshot_value(self, path):
+        """ Get one value out of the station snapshot without loading all of it.
+        path: 'station.instruments.fridge.parameters.T.value' or a tuple of keys
+        """
+        return get_snapshot_value(self._conn, self.guid, path)
+
     @property
     def run_description(self):
         if not self._run_description:
@@ -148,12 +229,13 @@ class QCodesDataFrame(QCodesBase):
     name = 'qcodes_dataframe'
     container = 'dataframe'
 
-    def __init__(self, db_path, guid=None, run_id=None, metadata=None):
+    def __init__(self, db_path, guid=None, run_id=None, run_description=None, metadata=None):
 
         self._init_args = {
             'db_path': db_path,
             'guid': guid,
             'run_id': run_id,
+            'run_description': run_description,
             'metadata': metadata,
         }
 
@@ -167,16 +249,27 @@ class QCodesDataFrame(QCodesBase):
         datadict = self._read_data(columns=[param])
         return datadict_to_dataframe(datadict)
 
-    def read(self):
-        """Load entire dataset into a container and return it"""
-        datadict = self._read_data()
+    def read(self, nworkers=None):
+        """Load entire dataset into a container and return it
+        nworkers: number of processes used to decode the run, None reads serially
+        """
+        datadict = self._read_data(nworkers=nworkers)
         return datadict_to_dataframe(datadict)
 
-    def read_chunked(self):
-        """Return iterator over container fragments of data source"""
+    def read_chunked(self, chunksize=None, columns=()):
+        """Return iterator over container fragments of data source
+        chunksize: if given, walk the results table once in blocks of this many
+            rows and yield all requested columns for each block. otherwise yield
+            one partition per dependent parameter.
+        """
+        if chunksize:
+            for datadict in self._iter_data(columns=columns, chunksize=chunksize):
+                yield datadict_to_dataframe(datadict)
+            return
+
         dep_params, _ = parameters_from_description(self.run_description)
-        for i in range(len(dep_params)):
-            yield self._get_partition(i)
+        for param in dep_params:
+            yield self._get_partition(param)
 
     def read_partition(self, idx):
         """Return a part of the data corresponding to i-th partition.
@@ -204,12 +297,13 @@ class QCodesXArray(QCodesBase):
     name = 'qcodes_xarray'
     container = 'xarray'
 
-    def __init__(self, db_path, guid=None, run_id=None, metadata=None):
+    def __init__(self, db_path, guid=None, run_id=None, run_description=None, metadata=None):
 
         self._init_args = {
             'db_path': db_path,
             'guid': guid,
             'run_id': run_id,
+            'run_description': run_description,
             'metadata': metadata,
         }
 
@@ -223,16 +317,27 @@ class QCodesXArray(QCodesBase):
         datadict = self._read_data(columns=[param])
         return datadict_to_xarray(datadict)
 
-    def read(self):
-        """Load entire dataset into a container and return it"""
-        datadict = self._read_data()
+    def read(self, nworkers=None):
+        """Load entire dataset into a container and return it
+        nworkers: number of processes used to decode the run, None reads serially
+        """
+        datadict = self._read_data(nworkers=nworkers)
         return datadict_to_xarray(datadict)
 
-    def read_chunked(self):
-        """Return iterator over container fragments of data source"""
+    def read_chunked(self, chunksize=None, columns=()):
+        """Return iterator over container fragments of data source
+        chunksize: if given, walk the results table once in blocks of this many
+            rows and yield all requested columns for each block. otherwise yield
+            one partition per dependent parameter.
+        """
+        if chunksize:
+            for datadict in self._iter_data(columns=columns, chunksize=chunksize):
+                yield datadict_to_xarray(datadict)
+            return
+
         dep_params, _ = parameters_from_description(self.run_description)
-        for i in range(len(dep_params)):
-            yield self._get_partition(i)
+        for param in dep_params:
+            yield self._get_partition(param)
 
     def read_partition(self, idx):
         """Return a part of the data corresponding to i-th partition.
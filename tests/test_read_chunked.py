@@ -0,0 +1,95 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from qcodes import (Measurement, Parameter, initialise_or_create_database_at,
+                    load_or_create_experiment)
+
+from intake_qcodes.catalog import QCodesCatalog
+from intake_qcodes.sources import QCodesDataFrame
+
+EXAMPLE_DB = Path(__file__).parents[1] / 'examples' / 'data' / 'test_dataset.db'
+
+
+def _same_data(chunks, full):
+    got = pd.concat(chunks)
+    return got.sort_index(kind='mergesort').equals(full.sort_index(kind='mergesort'))
+
+
+@pytest.fixture(scope='module')
+def scratch_db(tmp_path_factory):
+    """ runs that read_chunked cannot cut at a change of setpoint values """
+    db_path = str(tmp_path_factory.mktemp('db') / 'scratch.db')
+    initialise_or_create_database_at(db_path)
+    exp = load_or_create_experiment('chunks', 'scratch')
+
+    # standalone parameter, no setpoints at all
+    s = Parameter('s', get_cmd=None)
+    meas = Measurement(exp=exp)
+    meas.register_parameter(s)
+    with meas.run() as ds:
+        for i in range(1000):
+            ds.add_result((s, i))
+
+    # many rows at one fixed setpoint
+    x = Parameter('x', set_cmd=None)
+    y = Parameter('y', get_cmd=None)
+    meas = Measurement(exp=exp)
+    meas.register_parameter(x)
+    meas.register_parameter(y, setpoints=(x,))
+    with meas.run() as ds:
+        for i in range(1000):
+            ds.add_result((x, 0.5), (y, i))
+
+    # two parameters stored in separate rows per setpoint
+    a = Parameter('a', get_cmd=None)
+    b = Parameter('b', get_cmd=None)
+    meas = Measurement(exp=exp)
+    meas.register_parameter(x)
+    meas.register_parameter(a, setpoints=(x,))
+    meas.register_parameter(b, setpoints=(x,))
+    with meas.run() as ds:
+        for i in range(100):
+            ds.add_result((x, i), (a, i))
+            ds.add_result((x, i), (b, -i))
+
+    return db_path
+
+
+# chunksize of at least the number of rows stored for one setpoint
+@pytest.mark.parametrize('chunksize', [2, 7, 50])
+def test_example_runs(chunksize):
+    cat = QCodesCatalog(str(EXAMPLE_DB))
+    for run_id in cat.run_ids:
+        full = cat[run_id]().read()
+        chunks = list(cat[run_id]().read_chunked(chunksize=chunksize))
+        assert _same_data(chunks, full), run_id
+
+
+@pytest.mark.parametrize('chunksize', [1, 7, 50])
+def test_no_setpoints(scratch_db, chunksize):
+    src = QCodesDataFrame(scratch_db, run_id=1)
+    chunks = list(src.read_chunked(chunksize=chunksize, columns=['s']))
+    assert len(chunks) == -(-1000 // chunksize)
+    assert all(len(chunk) <= chunksize for chunk in chunks)
+    # no setpoints to index by, so each block has a range index of its own
+    assert pd.concat(chunks, ignore_index=True).equals(src.read_partition('s'))
+
+
+@pytest.mark.parametrize('chunksize', [1, 7, 50])
+def test_one_fixed_setpoint(scratch_db, chunksize):
+    src = QCodesDataFrame(scratch_db, run_id=2)
+    chunks = list(src.read_chunked(chunksize=chunksize))
+    assert len(chunks) == -(-1000 // chunksize)
+    assert all(len(chunk) <= chunksize for chunk in chunks)
+    assert _same_data(chunks, src.read())
+
+
+@pytest.mark.parametrize('chunksize', [2, 7, 50])
+def test_setpoint_rows_stay_together(scratch_db, chunksize):
+    src = QCodesDataFrame(scratch_db, run_id=3)
+    chunks = list(src.read_chunked(chunksize=chunksize))
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert not chunk.index.duplicated().any()
+    assert _same_data(chunks, src.read())